@@ -54,6 +54,11 @@ class InvenTreeConfig(AppConfig):
         obsolete = [
             'InvenTree.tasks.delete_expired_sessions',
             'stock.tasks.delete_old_stock_items',
+            # Replaced by 'InvenTree.tasks.daily_cleanup'
+            'InvenTree.tasks.delete_successful_tasks',
+            'InvenTree.tasks.delete_failed_tasks',
+            'InvenTree.tasks.delete_old_error_logs',
+            'InvenTree.tasks.delete_old_notifications',
         ]
 
         try:
@@ -78,6 +83,7 @@ class InvenTreeConfig(AppConfig):
                 ref_name,
                 schedule_type=task.interval,
                 minutes=task.minutes,
+                queue=task.queue,
             )
 
         # Put at least one task onto the backround worker stack,
@@ -639,9 +639,16 @@ else:
 
 _q_worker_timeout = int(get_setting('INVENTREE_BACKGROUND_TIMEOUT', 'background.timeout', 90))
 
+# Optional separate queue for long-running background tasks (e.g. migrations, backups)
+# If specified, a second worker must be started to process this queue (see INVENTREE_BACKGROUND_CLUSTER)
+BACKGROUND_SLOW_QUEUE = get_setting('INVENTREE_BACKGROUND_SLOW_QUEUE', 'background.slow_queue', None)
+
+# Name of the queue which is processed by this worker
+_q_cluster_name = get_setting('INVENTREE_BACKGROUND_CLUSTER', 'background.cluster', 'InvenTree')
+
 # django-q background worker configuration
 Q_CLUSTER = {
-    'name': 'InvenTree',
+    'name': _q_cluster_name,
     'label': 'Background Tasks',
     'workers': int(get_setting('INVENTREE_BACKGROUND_WORKERS', 'background.workers', 4)),
     'timeout': _q_worker_timeout,
@@ -653,6 +660,8 @@ Q_CLUSTER = {
     'orm': 'default',
     'cache': 'default',
     'sync': False,
+    # The slow queue worker does not run the scheduler (scheduled tasks are routed to the correct queue)
+    'scheduler': not BACKGROUND_SLOW_QUEUE or _q_cluster_name != BACKGROUND_SLOW_QUEUE,
 }
 
 # Configure django-q sentry integration
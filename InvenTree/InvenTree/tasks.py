@@ -1,22 +1,30 @@
 """Functions for tasks and a few general async tasks."""
 
+import hashlib
+import importlib
 import json
 import logging
 import os
-import random
 import re
 import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Callable, List
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List
 
+from django.apps import apps
 from django.conf import settings
 from django.core import mail as django_mail
-from django.core.exceptions import AppRegistryNotReady
+from django.core.cache import cache
+from django.core.exceptions import AppRegistryNotReady, MultipleObjectsReturned
 from django.core.management import call_command
 from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.recorder import MigrationRecorder
 from django.db.utils import (NotSupportedError, OperationalError,
                              ProgrammingError)
 from django.utils import timezone
@@ -24,21 +32,91 @@ from django.utils import timezone
 import requests
 from maintenance_mode.core import (get_maintenance_mode, maintenance_mode_on,
                                    set_maintenance_mode)
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from InvenTree.config import get_setting
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # File locking is not available on this platform (e.g. Windows)
+    fcntl = None
+
 logger = logging.getLogger("inventree")
 
+# Shared HTTP session for GitHub API requests (keeps the connection pool between checks)
+github_session = requests.Session()
+github_session.mount(
+    'https://',
+    HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=Retry(total=3, backoff_factor=0.5))
+)
+
+# Pattern for extracting the (major, minor, patch) version numbers from a release tag
+VERSION_REGEX = re.compile(r"(\d+)\.(\d+)\.(\d+)")
+
+# Pattern matching the queue routing which schedule_task writes into the Schedule kwargs
+QUEUE_ROUTING_REGEX = re.compile(r"\s*,?\s*q_options=\{'broker_name': '[^']*'\}")
+
+
+# Background task queues
+QUEUE_DEFAULT = 'default'
+QUEUE_SLOW = 'slow'
+
+
+def get_queue_name(queue: str = QUEUE_DEFAULT):
+    """Return the name of the django-q queue which should be used for the given task queue.
+
+    Long-running tasks are routed to the 'slow' queue, but only if a separate queue
+    has been configured (INVENTREE_BACKGROUND_SLOW_QUEUE). Otherwise, all tasks use the default queue.
+
+    Returns:
+        str: The name of the queue, or None if the default queue should be used
+    """
+    if queue == QUEUE_SLOW:
+        return getattr(settings, 'BACKGROUND_SLOW_QUEUE', None) or None
+
+    return None
+
+
+def get_schedule_kwargs(current: str, queue_name: str = None):
+    """Return the kwargs string for a Schedule, with the queue routing updated.
+
+    Any routing previously written by schedule_task is removed,
+    while other (e.g. admin-set) kwargs are kept.
+
+    Arguments:
+        current: The existing kwargs string of the Schedule (may be None)
+        queue_name: The name of the queue to route the task to, or None for the default queue
 
-def schedule_task(taskname, **kwargs):
+    Returns:
+        str: The new kwargs string, or None if empty
+    """
+    kwargs = QUEUE_ROUTING_REGEX.sub('', current or '').strip(' ,')
+
+    # Do not override any q_options which have been set manually
+    if queue_name and 'q_options' not in kwargs:
+        routing = f"q_options={{'broker_name': {queue_name!r}}}"
+        kwargs = f"{kwargs}, {routing}" if kwargs else routing
+
+    return kwargs or None
+
+
+def schedule_task(taskname, queue: str = QUEUE_DEFAULT, **kwargs):
     """Create a scheduled task.
 
     If the task has already been scheduled, ignore!
+
+    Arguments:
+        taskname: The dotted path of the function to schedule
+        queue: The task queue which the scheduled task should be sent to
     """
     # If unspecified, repeat indefinitely
     repeats = kwargs.pop('repeats', -1)
     kwargs['repeats'] = repeats
 
+    queue_name = get_queue_name(queue)
+
     try:
         from django_q.models import Schedule
     except AppRegistryNotReady:  # pragma: no cover
@@ -46,20 +124,30 @@ def schedule_task(taskname, **kwargs):
         return
 
     try:
+        # Route the task to the correct queue (via the schedule kwargs, which are passed to the task)
+        # Routing to a queue which is no longer configured is removed, other kwargs are kept
+        if 'kwargs' not in kwargs:
+            current = Schedule.objects.filter(func=taskname).values_list('kwargs', flat=True).first()
+            kwargs['kwargs'] = get_schedule_kwargs(current, queue_name)
+
         # If this task is already scheduled, don't schedule it again
         # Instead, update the scheduling parameters
-        if Schedule.objects.filter(func=taskname).exists():
-            logger.debug(f"Scheduled task '{taskname}' already exists - updating!")
+        # Note: Schedule.func is not unique, so concurrent workers may still create duplicates
+        _, created = Schedule.objects.update_or_create(
+            func=taskname,
+            defaults={
+                'name': taskname,
+                **kwargs,
+            }
+        )
 
-            Schedule.objects.filter(func=taskname).update(**kwargs)
+        if created:
+            logger.info(f"Created scheduled task '{taskname}'")
         else:
-            logger.info(f"Creating scheduled task '{taskname}'")
-
-            Schedule.objects.create(
-                name=taskname,
-                func=taskname,
-                **kwargs
-            )
+            logger.debug(f"Scheduled task '{taskname}' already exists - updated!")
+    except MultipleObjectsReturned:  # pragma: no cover
+        # Duplicate entries already exist (from an older version) - update them all
+        Schedule.objects.filter(func=taskname).update(**kwargs)
     except (OperationalError, ProgrammingError):  # pragma: no cover
         # Required if the DB is not ready yet
         pass
@@ -74,6 +162,83 @@ def raise_warning(msg):
         warnings.warn(msg, stacklevel=2)
 
 
+@contextmanager
+def database_lock(name: str):
+    """Acquire a named lock, shared between all processes which use the database.
+
+    The lock is provided by the database itself, so no separate lock service is required:
+    - PostgreSQL: Session level advisory lock
+    - MySQL: Named lock
+    - SQLite: File lock on a file alongside the database file
+
+    If no locking mechanism is available (e.g. an in-memory SQLite database,
+    or the lock file cannot be created) the lock is *always* acquired.
+
+    Arguments:
+        name: The name of the lock (e.g. 'inventree_migration_lock')
+
+    Yields:
+        bool: True if the lock was acquired, False if it is held by another process
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+
+    if connection.vendor == 'postgresql':
+        # Advisory locks are identified by a (signed) 64-bit integer
+        lock_id = int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), 'big', signed=True)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [lock_id])
+            acquired = bool(cursor.fetchone()[0])
+
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
+
+    elif connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT GET_LOCK(%s, 0)', [name])
+            acquired = cursor.fetchone()[0] == 1
+
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT RELEASE_LOCK(%s)', [name])
+
+    elif connection.vendor == 'sqlite' and fcntl is not None and not connection.is_in_memory_db():
+        lock_name = re.sub(r'[^\w.-]', '_', name)
+        lock_path = f"{connection.settings_dict['NAME']}.{lock_name}.lock"
+
+        try:
+            lock_file = open(lock_path, 'w')
+        except OSError as e:
+            logger.warning(f"Could not create lock file '{lock_path}' ({e}) - continuing without lock")
+            yield True
+            return
+
+        with lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                acquired = False
+            else:
+                acquired = True
+
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    else:
+        # No locking mechanism available
+        yield True
+
+
 def check_daily_holdoff(task_name: str, n_days: int = 1) -> bool:
     """Check if a periodic task should be run, based on the provided setting name.
 
@@ -89,52 +254,84 @@ def check_daily_holdoff(task_name: str, n_days: int = 1) -> bool:
 
     Note that this function creates some *hidden* global settings (designated with the _ prefix),
     which are used to keep a running track of when the particular task was was last run.
-    """
 
-    from common.models import InvenTreeSetting
+    The time of the last successful run is also stored in the cache,
+    so that a task which has run recently can be skipped without hitting the database.
+
+    The check is performed while holding a database lock (see database_lock),
+    so that multiple worker processes do not start the same task at once.
+    """
 
     if n_days <= 0:
         logger.info(f"Specified interval for task '{task_name}' < 1 - task will not run")
         return False
 
-    # Sleep a random number of seconds to prevent worker conflict
-    time.sleep(random.randint(1, 5))
+    # Claim a lock, to prevent multiple workers running the same task
+    with database_lock(f'inventree_holdoff_{task_name}') as acquired:
+        if not acquired:
+            logger.info(f"Task '{task_name}' is already being checked by another worker - skipping task")
+            return False
+
+        return _check_daily_holdoff(task_name, n_days)
+
+
+def parse_task_timestamp(value) -> int:
+    """Parse a task timestamp value (as stored by record_task_attempt / record_task_success).
+
+    Timestamps are stored as integer epoch seconds.
+    Values in ISO format (as written by older versions of InvenTree) are also accepted.
+
+    Returns:
+        int: The timestamp (in epoch seconds), or None if the value could not be parsed
+    """
+    if not value:
+        return None
+
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        pass
+
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (ValueError, TypeError):
+        return None
+
+
+def _check_daily_holdoff(task_name: str, n_days: int) -> bool:
+    """Perform the holdoff checks for check_daily_holdoff (with the task lock held)."""
+
+    from common.models import InvenTreeSetting
 
     attempt_key = f'_{task_name}_ATTEMPT'
     success_key = f'_{task_name}_SUCCESS'
+    holdoff_key = f'_holdoff_{task_name}'
 
-    # Check for recent success information
-    last_success = InvenTreeSetting.get_setting(success_key, '', cache=False)
+    now = time.time()
+    threshold = now - n_days * 86400
 
-    if last_success:
-        try:
-            last_success = datetime.fromisoformat(last_success)
-        except ValueError:
-            last_success = None
+    # Check for recent success information (first in the cache)
+    last_success = cache.get(holdoff_key, None)
 
-    if last_success:
-        threshold = datetime.now() - timedelta(days=n_days)
+    if not last_success or last_success <= threshold:
+        # Cache miss, or the cached value is out of date - check the database
+        last_success = parse_task_timestamp(InvenTreeSetting.get_setting(success_key, '', cache=True))
 
-        if last_success > threshold:
-            logger.info(f"Last successful run for '{task_name}' was too recent - skipping task")
-            return False
-
-    # Check for any information we have about this task
-    last_attempt = InvenTreeSetting.get_setting(attempt_key, '', cache=False)
+        if last_success:
+            cache.set(holdoff_key, last_success, timeout=n_days * 86400)
 
-    if last_attempt:
-        try:
-            last_attempt = datetime.fromisoformat(last_attempt)
-        except ValueError:
-            last_attempt = None
+    if last_success and last_success > threshold:
+        logger.info(f"Last successful run for '{task_name}' was too recent - skipping task")
+        return False
 
-    if last_attempt:
-        # Do not attempt if the most recent *attempt* was within 12 hours
-        threshold = datetime.now() - timedelta(hours=12)
+    # Check for any information we have about this task
+    # (always read from the database, as another worker may have just attempted this task)
+    last_attempt = parse_task_timestamp(InvenTreeSetting.get_setting(attempt_key, '', cache=False))
 
-        if last_attempt > threshold:
-            logger.info(f"Last attempt for '{task_name}' was too recent - skipping task")
-            return False
+    # Do not attempt if the most recent *attempt* was within 12 hours
+    if last_attempt and last_attempt > now - 12 * 3600:
+        logger.info(f"Last attempt for '{task_name}' was too recent - skipping task")
+        return False
 
     # Record this attempt
     record_task_attempt(task_name)
@@ -150,7 +347,7 @@ def record_task_attempt(task_name: str):
 
     logger.info(f"Logging task attempt for '{task_name}'")
 
-    InvenTreeSetting.set_setting(f'_{task_name}_ATTEMPT', datetime.now().isoformat(), None)
+    InvenTreeSetting.set_setting(f'_{task_name}_ATTEMPT', str(int(time.time())), None)
 
 
 def record_task_success(task_name: str):
@@ -158,18 +355,51 @@ def record_task_success(task_name: str):
 
     from common.models import InvenTreeSetting
 
-    InvenTreeSetting.set_setting(f'_{task_name}_SUCCESS', datetime.now().isoformat(), None)
+    now = int(time.time())
 
+    InvenTreeSetting.set_setting(f'_{task_name}_SUCCESS', str(now), None)
 
-def offload_task(taskname, *args, force_async=False, force_sync=False, **kwargs):
+    # Update the cached holdoff value
+    cache.set(f'_holdoff_{task_name}', now, timeout=86400)
+
+
+@lru_cache(maxsize=256)
+def resolve_task(taskname: str) -> Callable:
+    """Resolve a dotted function path (e.g. 'app.module.func') to the function it references.
+
+    The result is cached, so repeated lookups for the same path do not re-import the module.
+
+    Raises:
+        ValueError: If the function path is malformed
+        ModuleNotFoundError: If the module cannot be imported
+        AttributeError: If the function does not exist within the module
+    """
+    try:
+        mod_name, func_name = taskname.rsplit('.', 1)
+    except ValueError:
+        raise ValueError("Malformed function path")
+
+    try:
+        module = importlib.import_module(mod_name)
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError(f"No module named '{mod_name}'")
+
+    try:
+        return getattr(module, func_name)
+    except AttributeError:
+        raise AttributeError(f"No function named '{func_name}'")
+
+
+def offload_task(taskname, *args, force_async=False, force_sync=False, queue: str = QUEUE_DEFAULT, **kwargs):
     """Create an AsyncTask if workers are running. This is different to a 'scheduled' task, in that it only runs once!
 
     If workers are not running or force_sync flag
     is set then the task is ran synchronously.
+
+    Long-running tasks should be offloaded with queue=QUEUE_SLOW,
+    so that they do not hold up short tasks (if a separate queue is configured).
     """
     try:
-        import importlib
-
         from django_q.tasks import AsyncTask
 
         from InvenTree.status import is_worker_running
@@ -183,6 +413,11 @@ def offload_task(taskname, *args, force_async=False, force_sync=False, **kwargs)
         # Running as asynchronous task
         try:
             task = AsyncTask(taskname, *args, **kwargs)
+
+            if queue_name := get_queue_name(queue):
+                from django_q.brokers import get_broker
+                task.broker = get_broker(queue_name)
+
             task.run()
         except ImportError:
             raise_warning(f"WARNING: '{taskname}' not started - Function not found")
@@ -192,33 +427,10 @@ def offload_task(taskname, *args, force_async=False, force_sync=False, **kwargs)
             # function was passed - use that
             _func = taskname
         else:
-            # Split path
-            try:
-                app, mod, func = taskname.split('.')
-                app_mod = app + '.' + mod
-            except ValueError:
-                raise_warning(f"WARNING: '{taskname}' not started - Malformed function path")
-                return
-
-            # Import module from app
-            try:
-                _mod = importlib.import_module(app_mod)
-            except ModuleNotFoundError:
-                raise_warning(f"WARNING: '{taskname}' not started - No module named '{app_mod}'")
-                return
-
-            # Retrieve function
-            try:
-                _func = getattr(_mod, func)
-            except AttributeError:  # pragma: no cover
-                # getattr does not work for local import
-                _func = None
-
             try:
-                if not _func:
-                    _func = eval(func)  # pragma: no cover
-            except NameError:
-                raise_warning(f"WARNING: '{taskname}' not started - No function named '{func}'")
+                _func = resolve_task(taskname)
+            except (ValueError, ModuleNotFoundError, AttributeError) as e:
+                raise_warning(f"WARNING: '{taskname}' not started - {e}")
                 return
 
         # Workers are not running: run it as synchronous task
@@ -232,11 +444,13 @@ class ScheduledTask:
     - interval: The interval at which the task should be run
     - minutes: The number of minutes between task runs
     - func: The function to be run
+    - queue: The task queue the task should be sent to
     """
 
     func: Callable
     interval: str
     minutes: int = None
+    queue: str = QUEUE_DEFAULT
 
     MINUTES = "I"
     HOURLY = "H"
@@ -245,22 +459,35 @@ class ScheduledTask:
     MONTHLY = "M"
     QUARTERLY = "Q"
     YEARLY = "Y"
-    TYPE = [MINUTES, HOURLY, DAILY, WEEKLY, MONTHLY, QUARTERLY, YEARLY]
+    TYPE = frozenset([MINUTES, HOURLY, DAILY, WEEKLY, MONTHLY, QUARTERLY, YEARLY])
 
 
 class TaskRegister:
-    """Registery for periodicall tasks."""
-    task_list: List[ScheduledTask] = []
+    """Registery for periodicall tasks.
 
-    def register(self, task, schedule, minutes: int = None):
+    Tasks are keyed by their full function path,
+    so registering the same function again (e.g. on module reload) replaces the existing entry.
+    """
+
+    def __init__(self):
+        """Initialize the (empty) task registry."""
+        self._tasks: Dict[str, ScheduledTask] = {}
+
+    @property
+    def task_list(self) -> List[ScheduledTask]:
+        """Return a list of all registered tasks."""
+        return list(self._tasks.values())
+
+    def register(self, task, schedule, minutes: int = None, queue: str = QUEUE_DEFAULT):
         """Register a task with the que."""
-        self.task_list.append(ScheduledTask(task, schedule, minutes))
+        key = f'{task.__module__}.{task.__name__}'
+        self._tasks[key] = ScheduledTask(task, schedule, minutes, queue)
 
 
 tasks = TaskRegister()
 
 
-def scheduled_task(interval: str, minutes: int = None, tasklist: TaskRegister = None):
+def scheduled_task(interval: str, minutes: int = None, tasklist: TaskRegister = None, queue: str = QUEUE_DEFAULT):
     """Register the given task as a scheduled task.
 
     Example:
@@ -274,6 +501,7 @@ def scheduled_task(interval: str, minutes: int = None, tasklist: TaskRegister =
         interval (str): The interval at which the task should be run
         minutes (int, optional): The number of minutes between task runs. Defaults to None.
         tasklist (TaskRegister, optional): The list the tasks should be registered to. Defaults to None.
+        queue (str, optional): The task queue the task should be sent to. Defaults to QUEUE_DEFAULT.
 
     Raises:
         ValueError: If decorated object is not callable
@@ -284,19 +512,82 @@ def scheduled_task(interval: str, minutes: int = None, tasklist: TaskRegister =
     """
 
     def _task_wrapper(admin_class):
-        if not isinstance(admin_class, Callable):
+        if not callable(admin_class):
             raise ValueError('Wrapped object must be a function')
 
         if interval not in ScheduledTask.TYPE:
-            raise ValueError(f'Invalid interval. Must be one of {ScheduledTask.TYPE}')
+            raise ValueError(f'Invalid interval. Must be one of {sorted(ScheduledTask.TYPE)}')
 
         _tasks = tasklist if tasklist else tasks
-        _tasks.register(admin_class, interval, minutes=minutes)
+        _tasks.register(admin_class, interval, minutes=minutes, queue=queue)
 
         return admin_class
     return _task_wrapper
 
 
+_imported_objects = {}
+
+
+def _safe_import(path: str):
+    """Import and return the object at the provided dotted path (e.g. 'django_q.models.Success').
+
+    Once the app registry is ready, the imported object is cached,
+    so that subsequent task runs can skip the import machinery entirely.
+
+    Raises:
+        AppRegistryNotReady: If the app registry is not yet ready
+    """
+    try:
+        return _imported_objects[path]
+    except KeyError:
+        pass
+
+    apps.check_apps_ready()
+
+    mod_name, obj_name = path.rsplit('.', 1)
+    obj = getattr(importlib.import_module(mod_name), obj_name)
+
+    _imported_objects[path] = obj
+
+    return obj
+
+
+def delete_in_batches(queryset, batch_size: int = 5000, raw: bool = False) -> int:
+    """Delete all records in the provided queryset, in batches.
+
+    Deleting a very large number of rows in a single query can take a long time,
+    and hold locks on the table, so the records are removed in chunks.
+
+    Arguments:
+        queryset: The queryset of records to delete
+        batch_size: The maximum number of records to delete in a single query
+        raw: If True, delete with a single SQL statement per batch, bypassing cascades and delete signals.
+            Only use this for models which have no related objects or signal handlers!
+
+    Returns:
+        int: The total number of records which were deleted
+    """
+
+    model = queryset.model
+    deleted = 0
+
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+
+        if not pks:
+            break
+
+        batch = model.objects.filter(pk__in=pks)
+
+        if raw:
+            deleted += batch._raw_delete(batch.db)
+        else:
+            n, _ = batch.delete()
+            deleted += n
+
+    return deleted
+
+
 @scheduled_task(ScheduledTask.MINUTES, 5)
 def heartbeat():
     """Simple task which runs at 5 minute intervals, so we can determine that the background worker is actually running.
@@ -304,7 +595,7 @@ def heartbeat():
     (There is probably a less "hacky" way of achieving this)?
     """
     try:
-        from django_q.models import Success
+        Success = _safe_import('django_q.models.Success')
     except AppRegistryNotReady:  # pragma: no cover
         logger.info("Could not perform heartbeat task - App registry not ready")
         return
@@ -318,124 +609,208 @@ def heartbeat():
         started__lte=threshold
     )
 
-    heartbeats.delete()
+    # Success records have no related objects or signal handlers, so delete directly
+    heartbeats._raw_delete(heartbeats.db)
 
 
-@scheduled_task(ScheduledTask.DAILY)
-def delete_successful_tasks():
-    """Delete successful task logs which are older than a specified period"""
-    try:
-        from django_q.models import Success
+def delete_successful_tasks(threshold=None):
+    """Delete successful task logs which are older than a specified period
 
-        from common.models import InvenTreeSetting
+    Arguments:
+        threshold: Delete records older than this datetime (if not specified, read from settings)
+    """
+    try:
+        Success = _safe_import('django_q.models.Success')
+        InvenTreeSetting = _safe_import('common.models.InvenTreeSetting')
+    except AppRegistryNotReady:  # pragma: no cover
+        logger.info("Could not perform 'delete_successful_tasks' - App registry not ready")
+        return
 
+    if threshold is None:
         days = InvenTreeSetting.get_setting('INVENTREE_DELETE_TASKS_DAYS', 30)
         threshold = timezone.now() - timedelta(days=days)
 
-        # Delete successful tasks
-        results = Success.objects.filter(
-            started__lte=threshold
-        )
+    # Delete successful tasks
+    results = Success.objects.filter(
+        started__lte=threshold
+    )
 
-        if results.count() > 0:
-            logger.info(f"Deleting {results.count()} successful task records")
-            results.delete()
+    deleted = delete_in_batches(results, raw=True)
 
-    except AppRegistryNotReady:  # pragma: no cover
-        logger.info("Could not perform 'delete_successful_tasks' - App registry not ready")
+    if deleted:
+        logger.info(f"Deleted {deleted} successful task records")
 
 
-@scheduled_task(ScheduledTask.DAILY)
-def delete_failed_tasks():
-    """Delete failed task logs which are older than a specified period"""
+def delete_failed_tasks(threshold=None):
+    """Delete failed task logs which are older than a specified period
 
-    try:
-        from django_q.models import Failure
+    Arguments:
+        threshold: Delete records older than this datetime (if not specified, read from settings)
+    """
 
-        from common.models import InvenTreeSetting
+    try:
+        Failure = _safe_import('django_q.models.Failure')
+        InvenTreeSetting = _safe_import('common.models.InvenTreeSetting')
+    except AppRegistryNotReady:  # pragma: no cover
+        logger.info("Could not perform 'delete_failed_tasks' - App registry not ready")
+        return
 
+    if threshold is None:
         days = InvenTreeSetting.get_setting('INVENTREE_DELETE_TASKS_DAYS', 30)
         threshold = timezone.now() - timedelta(days=days)
 
-        # Delete failed tasks
-        results = Failure.objects.filter(
-            started__lte=threshold
-        )
+    # Delete failed tasks
+    results = Failure.objects.filter(
+        started__lte=threshold
+    )
 
-        if results.count() > 0:
-            logger.info(f"Deleting {results.count()} failed task records")
-            results.delete()
+    deleted = delete_in_batches(results, raw=True)
 
-    except AppRegistryNotReady:  # pragma: no cover
-        logger.info("Could not perform 'delete_failed_tasks' - App registry not ready")
+    if deleted:
+        logger.info(f"Deleted {deleted} failed task records")
 
 
-@scheduled_task(ScheduledTask.DAILY)
-def delete_old_error_logs():
-    """Delete old error logs from the server."""
-    try:
-        from error_report.models import Error
+def delete_old_error_logs(threshold=None):
+    """Delete old error logs from the server.
 
-        from common.models import InvenTreeSetting
+    Arguments:
+        threshold: Delete records older than this datetime (if not specified, read from settings)
+    """
+    try:
+        Error = _safe_import('error_report.models.Error')
+        InvenTreeSetting = _safe_import('common.models.InvenTreeSetting')
+    except AppRegistryNotReady:  # pragma: no cover
+        # Apps not yet loaded
+        logger.info("Could not perform 'delete_old_error_logs' - App registry not ready")
+        return
 
+    if threshold is None:
         days = InvenTreeSetting.get_setting('INVENTREE_DELETE_ERRORS_DAYS', 30)
         threshold = timezone.now() - timedelta(days=days)
 
-        errors = Error.objects.filter(
-            when__lte=threshold,
-        )
+    errors = Error.objects.filter(
+        when__lte=threshold,
+    )
 
-        if errors.count() > 0:
-            logger.info(f"Deleting {errors.count()} old error logs")
-            errors.delete()
+    deleted, _ = errors.delete()
 
-    except AppRegistryNotReady:  # pragma: no cover
-        # Apps not yet loaded
-        logger.info("Could not perform 'delete_old_error_logs' - App registry not ready")
+    if deleted:
+        logger.info(f"Deleted {deleted} old error logs")
 
 
-@scheduled_task(ScheduledTask.DAILY)
-def delete_old_notifications():
-    """Delete old notification logs"""
+def delete_old_notifications(threshold=None):
+    """Delete old notification logs
+
+    Arguments:
+        threshold: Delete records older than this datetime (if not specified, read from settings)
+    """
 
     try:
-        from common.models import (InvenTreeSetting, NotificationEntry,
-                                   NotificationMessage)
+        InvenTreeSetting = _safe_import('common.models.InvenTreeSetting')
+        NotificationEntry = _safe_import('common.models.NotificationEntry')
+        NotificationMessage = _safe_import('common.models.NotificationMessage')
+    except AppRegistryNotReady:
+        logger.info("Could not perform 'delete_old_notifications' - App registry not ready")
+        return
 
+    if threshold is None:
         days = InvenTreeSetting.get_setting('INVENTREE_DELETE_NOTIFICATIONS_DAYS', 30)
         threshold = timezone.now() - timedelta(days=days)
 
-        items = NotificationEntry.objects.filter(
-            updated__lte=threshold
-        )
+    items = NotificationEntry.objects.filter(
+        updated__lte=threshold
+    )
 
-        if items.count() > 0:
-            logger.info(f"Deleted {items.count()} old notification entries")
-            items.delete()
+    deleted, _ = items.delete()
 
-        items = NotificationMessage.objects.filter(
-            creation__lte=threshold
-        )
+    if deleted:
+        logger.info(f"Deleted {deleted} old notification entries")
 
-        if items.count() > 0:
-            logger.info(f"Deleted {items.count()} old notification messages")
-            items.delete()
+    items = NotificationMessage.objects.filter(
+        creation__lte=threshold
+    )
 
-    except AppRegistryNotReady:
-        logger.info("Could not perform 'delete_old_notifications' - App registry not ready")
+    deleted, _ = items.delete()
+
+    if deleted:
+        logger.info(f"Deleted {deleted} old notification messages")
+
+
+@scheduled_task(ScheduledTask.DAILY)
+def daily_cleanup():
+    """Delete old task logs, error logs and notifications.
+
+    Runs each of the cleanup tasks in turn, as a single scheduled task.
+    """
+    try:
+        InvenTreeSetting = _safe_import('common.models.InvenTreeSetting')
+    except AppRegistryNotReady:  # pragma: no cover
+        logger.info("Could not perform 'daily_cleanup' - App registry not ready")
+        return
+
+    now = timezone.now()
+
+    # Fetch all required settings at once (from the cache, or in a single query)
+    days = InvenTreeSetting.get_many(
+        [
+            'INVENTREE_DELETE_TASKS_DAYS',
+            'INVENTREE_DELETE_ERRORS_DAYS',
+            'INVENTREE_DELETE_NOTIFICATIONS_DAYS',
+        ],
+        defaults={
+            'INVENTREE_DELETE_TASKS_DAYS': 30,
+            'INVENTREE_DELETE_ERRORS_DAYS': 30,
+            'INVENTREE_DELETE_NOTIFICATIONS_DAYS': 30,
+        }
+    )
+
+    task_threshold = now - timedelta(days=days['INVENTREE_DELETE_TASKS_DAYS'])
+
+    steps = [
+        (delete_successful_tasks, task_threshold),
+        (delete_failed_tasks, task_threshold),
+        (delete_old_error_logs, now - timedelta(days=days['INVENTREE_DELETE_ERRORS_DAYS'])),
+        (delete_old_notifications, now - timedelta(days=days['INVENTREE_DELETE_NOTIFICATIONS_DAYS'])),
+    ]
+
+    failed = []
+
+    # A failure in one step must not prevent the remaining steps from running
+    for func, threshold in steps:
+        try:
+            func(threshold=threshold)
+        except Exception as e:
+            logger.error(f"Error running cleanup step '{func.__name__}': {e} ({type(e)})")
+            failed.append(func.__name__)
+
+    # Raise an error once all steps have run, so the task is recorded as failed
+    if failed:
+        raise RuntimeError(f"daily_cleanup failed for: {', '.join(failed)}")
 
 
 @scheduled_task(ScheduledTask.DAILY)
 def check_for_updates():
     """Check if there is an update for InvenTree."""
     try:
-        import common.models
+        InvenTreeSetting = _safe_import('common.models.InvenTreeSetting')
     except AppRegistryNotReady:  # pragma: no cover
         # Apps not yet loaded!
         logger.info("Could not perform 'check_for_updates' - App registry not ready")
         return
 
-    interval = int(common.models.InvenTreeSetting.get_setting('INVENTREE_UPDATE_CHECK_INTERVAL', 7, cache=False))
+    # Fetch all required settings at once (from the cache, or in a single query)
+    values = InvenTreeSetting.get_many(
+        [
+            'INVENTREE_UPDATE_CHECK_INTERVAL',
+            '_INVENTREE_GITHUB_ETAG',
+            '_INVENTREE_LATEST_VERSION',
+        ],
+        defaults={
+            'INVENTREE_UPDATE_CHECK_INTERVAL': 7,
+        }
+    )
+
+    interval = int(values['INVENTREE_UPDATE_CHECK_INTERVAL'])
 
     # Check if we should check for updates *today*
     if not check_daily_holdoff('check_for_updates', interval):
@@ -452,11 +827,24 @@ def check_for_updates():
         if token:
             headers['Authorization'] = f"Bearer {token}"
 
-    response = requests.get(
+    # If we already know the latest version, only request the release data if it has changed
+    etag = values['_INVENTREE_GITHUB_ETAG']
+
+    if etag and values['_INVENTREE_LATEST_VERSION']:
+        headers['If-None-Match'] = etag
+
+    response = github_session.get(
         'https://api.github.com/repos/inventree/inventree/releases/latest',
-        headers=headers
+        headers=headers,
+        timeout=(5, 10)
     )
 
+    if response.status_code == 304:
+        # Release data has not changed since the last check
+        logger.info("Latest InvenTree version has not changed")
+        record_task_success('check_for_updates')
+        return
+
     if response.status_code != 200:
         raise ValueError(f'Unexpected status code from GitHub API: {response.status_code}')  # pragma: no cover
 
@@ -467,38 +855,41 @@ def check_for_updates():
     if not tag:
         raise ValueError("'tag_name' missing from GitHub response")  # pragma: no cover
 
-    match = re.match(r"^.*(\d+)\.(\d+)\.(\d+).*$", tag)
+    match = VERSION_REGEX.search(tag)
 
-    if len(match.groups()) != 3:  # pragma: no cover
+    if not match:  # pragma: no cover
         logger.warning(f"Version '{tag}' did not match expected pattern")
         return
 
-    latest_version = [int(x) for x in match.groups()]
-
-    if len(latest_version) != 3:
-        raise ValueError(f"Version '{tag}' is not correct format")  # pragma: no cover
-
     logger.info(f"Latest InvenTree version: '{tag}'")
 
     # Save the version to the database
-    common.models.InvenTreeSetting.set_setting(
+    InvenTreeSetting.set_setting(
         '_INVENTREE_LATEST_VERSION',
         tag,
         None
     )
 
+    # Save the ETag, so the next check can be a conditional request
+    InvenTreeSetting.set_setting(
+        '_INVENTREE_GITHUB_ETAG',
+        response.headers.get('ETag', ''),
+        None
+    )
+
     # Record that this task was successful
     record_task_success('check_for_updates')
 
 
-@scheduled_task(ScheduledTask.DAILY)
+@scheduled_task(ScheduledTask.DAILY, queue=QUEUE_SLOW)
 def update_exchange_rates():
     """Update currency exchange rates."""
     try:
-        from djmoney.contrib.exchange.models import ExchangeBackend, Rate
-
-        from common.settings import currency_code_default, currency_codes
-        from InvenTree.exchange import InvenTreeExchange
+        ExchangeBackend = _safe_import('djmoney.contrib.exchange.models.ExchangeBackend')
+        Rate = _safe_import('djmoney.contrib.exchange.models.Rate')
+        currency_code_default = _safe_import('common.settings.currency_code_default')
+        currency_codes = _safe_import('common.settings.currency_codes')
+        InvenTreeExchange = _safe_import('InvenTree.exchange.InvenTreeExchange')
     except AppRegistryNotReady:  # pragma: no cover
         # Apps not yet loaded!
         logger.info("Could not perform 'update_exchange_rates' - App registry not ready")
@@ -533,17 +924,35 @@ def update_exchange_rates():
         logger.error(f"Error updating exchange rates: {e} ({type(e)})")
 
 
-@scheduled_task(ScheduledTask.DAILY)
+def _run_backup_command(command: str):
+    """Run a single backup management command (from a worker thread)."""
+    try:
+        call_command(command, noinput=True, clean=True, compress=True, interactive=False)
+    finally:
+        # Database connections are per-thread, and must be closed explicitly
+        connections.close_all()
+
+
+@scheduled_task(ScheduledTask.DAILY, queue=QUEUE_SLOW)
 def run_backup():
     """Run the backup command."""
 
-    from common.models import InvenTreeSetting
+    InvenTreeSetting = _safe_import('common.models.InvenTreeSetting')
+
+    # Fetch all required settings at once (from the cache, or in a single query)
+    values = InvenTreeSetting.get_many(
+        ['INVENTREE_BACKUP_ENABLE', 'INVENTREE_BACKUP_DAYS'],
+        defaults={
+            'INVENTREE_BACKUP_ENABLE': False,
+            'INVENTREE_BACKUP_DAYS': 1,
+        }
+    )
 
-    if not InvenTreeSetting.get_setting('INVENTREE_BACKUP_ENABLE', False, cache=False):
+    if not values['INVENTREE_BACKUP_ENABLE']:
         # Backups are not enabled - exit early
         return
 
-    interval = int(InvenTreeSetting.get_setting('INVENTREE_BACKUP_DAYS', 1, cache=False))
+    interval = int(values['INVENTREE_BACKUP_DAYS'])
 
     # Check if should run this task *today*
     if not check_daily_holdoff('run_backup', interval):
@@ -551,8 +960,15 @@ def run_backup():
 
     logger.info("Performing automated database backup task")
 
-    call_command("dbbackup", noinput=True, clean=True, compress=True, interactive=False)
-    call_command("mediabackup", noinput=True, clean=True, compress=True, interactive=False)
+    # The database and media backups are independent, so run them concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(_run_backup_command, command) for command in ['dbbackup', 'mediabackup']
+        ]
+
+        # Wait for both backups to complete (re-raising any errors)
+        for future in futures:
+            future.result()
 
     # Record that this task was successful
     record_task_success('run_backup')
@@ -560,8 +976,11 @@ def run_backup():
 
 def send_email(subject, body, recipients, from_email=None, html_message=None):
     """Send an email with the specified subject and body, to the specified recipients list."""
-    if type(recipients) == str:
+    if isinstance(recipients, str):
         recipients = [recipients]
+    elif not isinstance(recipients, (list, tuple)):
+        # Materialize any other iterable (e.g. a generator or set)
+        recipients = list(recipients)
 
     import InvenTree.ready
 
@@ -569,18 +988,35 @@ def send_email(subject, body, recipients, from_email=None, html_message=None):
         # If we are importing data, don't send emails
         return
 
-    offload_task(
-        django_mail.send_mail,
-        subject,
-        body,
-        from_email,
-        recipients,
-        fail_silently=False,
-        html_message=html_message
-    )
+    # Prevent the same email being queued multiple times in quick succession
+    email_hash = hashlib.blake2b(
+        json.dumps([subject, body, html_message, sorted(recipients), from_email], default=str).encode(),
+        digest_size=16
+    ).hexdigest()
 
+    dedup_key = f'mail-dedup:{email_hash}'
 
-@scheduled_task(ScheduledTask.DAILY)
+    if not cache.add(dedup_key, 1, timeout=60):
+        logger.info(f"Email '{subject}' has already been queued - skipping")
+        return
+
+    try:
+        offload_task(
+            django_mail.send_mail,
+            subject,
+            body,
+            from_email,
+            recipients,
+            fail_silently=False,
+            html_message=html_message
+        )
+    except Exception:
+        # The email was not sent (or queued), so allow it to be retried
+        cache.delete(dedup_key)
+        raise
+
+
+@scheduled_task(ScheduledTask.DAILY, queue=QUEUE_SLOW)
 def check_for_migrations(worker: bool = True):
     """Checks if migrations are needed.
 
@@ -590,7 +1026,18 @@ def check_for_migrations(worker: bool = True):
     if not get_setting('INVENTREE_AUTO_UPDATE', 'auto_update'):
         return
 
-    from plugin import registry
+    with database_lock('inventree_migration_lock') as acquired:
+        if not acquired:
+            logger.info('Migration check is already running in another process - skipping')
+            return
+
+        _run_migrations(worker)
+
+
+def _run_migrations(worker: bool):
+    """Run any outstanding migrations (with the migration lock held)."""
+
+    registry = _safe_import('plugin.registry')
 
     plan = get_migration_plan()
 
@@ -644,8 +1091,53 @@ def check_for_migrations(worker: bool = True):
     registry.reload_plugins(full_reload=True, force_reload=True)
 
 
+# Migration state (files hash, applied migration count) for which no migrations were outstanding
+_migration_state_complete = None
+
+
+def get_migration_files_hash() -> str:
+    """Return a hash of the migration files for all installed apps.
+
+    The hash is based on the name and modification time of each file,
+    so any added, removed or changed migration results in a different value.
+    """
+    digest = hashlib.sha256()
+
+    for app in apps.get_app_configs():
+        path = Path(app.path).joinpath('migrations')
+
+        if not path.is_dir():
+            continue
+
+        for entry in sorted(os.scandir(path), key=lambda e: e.name):
+            if entry.name.endswith('.py'):
+                digest.update(f'{app.label}:{entry.name}:{entry.stat().st_mtime_ns};'.encode())
+
+    return digest.hexdigest()
+
+
 def get_migration_plan():
-    """Returns a list of migrations which are needed to be run."""
-    executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+    """Returns a list of migrations which are needed to be run.
+
+    If neither the migration files nor the applied migrations have changed
+    since the last check found no outstanding migrations, the (expensive) full check is skipped.
+    """
+    global _migration_state_complete
+
+    connection = connections[DEFAULT_DB_ALIAS]
+    recorder = MigrationRecorder(connection)
+
+    state = (
+        get_migration_files_hash(),
+        recorder.migration_qs.count() if recorder.has_table() else 0,
+    )
+
+    if state == _migration_state_complete:
+        return []
+
+    executor = MigrationExecutor(connection)
     plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+    _migration_state_complete = None if plan else state
+
     return plan
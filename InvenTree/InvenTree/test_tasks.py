@@ -1,10 +1,16 @@
 """Unit tests for task management."""
 
 import os
+import tempfile
 from datetime import timedelta
+from unittest import mock, skipUnless
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.recorder import MigrationRecorder
 from django.db.utils import NotSupportedError
 from django.test import TestCase
 from django.utils import timezone
@@ -48,6 +54,66 @@ class ScheduledTaskTests(TestCase):
         t = Schedule.objects.get(func=task)
         self.assertEqual(t.minutes, 5)
 
+    def test_task_queue(self):
+        """Test that scheduled tasks are routed to the correct queue."""
+        task = 'InvenTree.tasks.run_backup'
+
+        # No separate queue configured - default queue is used
+        InvenTree.tasks.schedule_task(task, queue=InvenTree.tasks.QUEUE_SLOW, schedule_type=Schedule.DAILY)
+        self.assertIsNone(Schedule.objects.get(func=task).kwargs)
+
+        # Existing schedule kwargs are not overwritten
+        Schedule.objects.filter(func=task).update(kwargs="foo='bar'")
+        InvenTree.tasks.schedule_task(task, queue=InvenTree.tasks.QUEUE_SLOW, schedule_type=Schedule.DAILY)
+        self.assertEqual(Schedule.objects.get(func=task).kwargs, "foo='bar'")
+
+        with self.settings(BACKGROUND_SLOW_QUEUE='InvenTree-slow'):
+            self.assertEqual(InvenTree.tasks.get_queue_name(InvenTree.tasks.QUEUE_SLOW), 'InvenTree-slow')
+            self.assertIsNone(InvenTree.tasks.get_queue_name(InvenTree.tasks.QUEUE_DEFAULT))
+
+            InvenTree.tasks.schedule_task(task, queue=InvenTree.tasks.QUEUE_SLOW, schedule_type=Schedule.DAILY)
+            self.assertEqual(Schedule.objects.get(func=task).kwargs, "foo='bar', q_options={'broker_name': 'InvenTree-slow'}")
+
+            # Rescheduling does not duplicate the routing
+            InvenTree.tasks.schedule_task(task, queue=InvenTree.tasks.QUEUE_SLOW, schedule_type=Schedule.DAILY)
+            self.assertEqual(Schedule.objects.get(func=task).kwargs, "foo='bar', q_options={'broker_name': 'InvenTree-slow'}")
+
+        # Separate queue no longer configured - the routing is removed, other kwargs are kept
+        InvenTree.tasks.schedule_task(task, queue=InvenTree.tasks.QUEUE_SLOW, schedule_type=Schedule.DAILY)
+        self.assertEqual(Schedule.objects.get(func=task).kwargs, "foo='bar'")
+
+        Schedule.objects.filter(func=task).update(kwargs="q_options={'broker_name': 'InvenTree-slow'}")
+        InvenTree.tasks.schedule_task(task, queue=InvenTree.tasks.QUEUE_SLOW, schedule_type=Schedule.DAILY)
+        self.assertIsNone(Schedule.objects.get(func=task).kwargs)
+
+    def test_register_task(self):
+        """Ensure that registering the same function twice does not duplicate it."""
+        register = InvenTree.tasks.TaskRegister()
+
+        register.register(get_result, InvenTree.tasks.ScheduledTask.DAILY)
+        register.register(get_result, InvenTree.tasks.ScheduledTask.HOURLY)
+
+        self.assertEqual(len(register.task_list), 1)
+        self.assertEqual(register.task_list[0].interval, InvenTree.tasks.ScheduledTask.HOURLY)
+
+        # The global register is not affected
+        self.assertNotIn(get_result, [t.func for t in InvenTree.tasks.tasks.task_list])
+
+    def test_scheduled_task_decorator(self):
+        """Test the scheduled_task decorator."""
+        register = InvenTree.tasks.TaskRegister()
+
+        InvenTree.tasks.scheduled_task(InvenTree.tasks.ScheduledTask.WEEKLY, tasklist=register)(get_result)
+        self.assertEqual(len(register.task_list), 1)
+
+        # Invalid interval
+        with self.assertRaises(ValueError):
+            InvenTree.tasks.scheduled_task('X', tasklist=register)(get_result)
+
+        # Object which is not callable
+        with self.assertRaises(ValueError):
+            InvenTree.tasks.scheduled_task(InvenTree.tasks.ScheduledTask.DAILY, tasklist=register)('abc')
+
 
 def get_result():
     """Demo function for test_offloading."""
@@ -78,6 +144,43 @@ class InvenTreeTaskTests(TestCase):
         with self.assertWarnsMessage(UserWarning, "WARNING: 'InvenTree.test_tasks.doesnotexsist' not started - No function named 'doesnotexsist'"):
             InvenTree.tasks.offload_task('InvenTree.test_tasks.doesnotexsist')
 
+    def test_send_email(self):
+        """Test that send_email accepts different types of recipient list."""
+        from django.core import mail
+
+        InvenTree.tasks.send_email('Test single', 'body', 'single@example.com')
+        InvenTree.tasks.send_email('Test generator', 'body', (f'user{idx}@example.com' for idx in range(3)))
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, ['single@example.com'])
+        self.assertEqual(mail.outbox[1].to, ['user0@example.com', 'user1@example.com', 'user2@example.com'])
+
+    def test_send_email_duplicate(self):
+        """Test that the same email is not queued twice in quick succession."""
+        from django.core import mail
+
+        cache.clear()
+
+        InvenTree.tasks.send_email('Test duplicate', 'body', ['a@example.com', 'b@example.com'])
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Same email (recipients in a different order, passed as a generator)
+        InvenTree.tasks.send_email('Test duplicate', 'body', (addr for addr in ['b@example.com', 'a@example.com']))
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Different body
+        InvenTree.tasks.send_email('Test duplicate', 'other body', ['a@example.com', 'b@example.com'])
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[1].to, ['a@example.com', 'b@example.com'])
+
+        # An email which failed to send can be retried straight away
+        with mock.patch('django.core.mail.send_mail', side_effect=ConnectionError('abc')):
+            with self.assertRaises(ConnectionError):
+                InvenTree.tasks.send_email('Test retry', 'body', ['a@example.com'])
+
+        InvenTree.tasks.send_email('Test retry', 'body', ['a@example.com'])
+        self.assertEqual(len(mail.outbox), 3)
+
     def test_task_hearbeat(self):
         """Test the task heartbeat."""
         InvenTree.tasks.offload_task(InvenTree.tasks.heartbeat)
@@ -91,6 +194,25 @@ class InvenTreeTaskTests(TestCase):
         results = Success.objects.filter(started__lte=threshold)
         self.assertEqual(len(results), 0)
 
+    def test_delete_in_batches(self):
+        """Test that records are deleted in batches."""
+        from django_q.models import Failure
+
+        for idx in range(5):
+            Failure.objects.create(id=f'fail-{idx}', name=f'task-{idx}', func='abc', success=False, stopped=threshold, started=threshold_low)
+
+        deleted = InvenTree.tasks.delete_in_batches(Failure.objects.filter(started__lte=threshold), batch_size=2)
+        self.assertEqual(deleted, 5)
+        self.assertEqual(Failure.objects.filter(started__lte=threshold).count(), 0)
+
+        # Raw deletion
+        for idx in range(3):
+            Failure.objects.create(id=f'raw-fail-{idx}', name=f'task-{idx}', func='abc', success=False, stopped=threshold, started=threshold_low)
+
+        deleted = InvenTree.tasks.delete_in_batches(Failure.objects.filter(started__lte=threshold), batch_size=2, raw=True)
+        self.assertEqual(deleted, 3)
+        self.assertEqual(Failure.objects.filter(started__lte=threshold).count(), 0)
+
     def test_task_delete_old_error_logs(self):
         """Test the task delete_old_error_logs."""
         # Create error
@@ -109,6 +231,36 @@ class InvenTreeTaskTests(TestCase):
         errors = Error.objects.filter(when__lte=threshold,)
         self.assertEqual(len(errors), 0)
 
+    def test_task_daily_cleanup(self):
+        """Test the task daily_cleanup."""
+        from django_q.models import Failure, Success
+
+        Success.objects.create(id='success-abc', name='abc', func='abc', stopped=threshold, started=threshold_low)
+        Failure.objects.create(id='failure-def', name='def', func='def', success=False, stopped=threshold, started=threshold_low)
+
+        error_obj = Error.objects.create()
+        error_obj.when = threshold_low
+        error_obj.save()
+
+        self.assertEqual(Success.objects.filter(started__lte=threshold).count(), 1)
+        self.assertEqual(Failure.objects.filter(started__lte=threshold).count(), 1)
+
+        InvenTree.tasks.offload_task(InvenTree.tasks.daily_cleanup)
+
+        self.assertEqual(Success.objects.filter(started__lte=threshold).count(), 0)
+        self.assertEqual(Failure.objects.filter(started__lte=threshold).count(), 0)
+        self.assertEqual(Error.objects.filter(when__lte=threshold).count(), 0)
+
+    def test_task_daily_cleanup_error(self):
+        """Test that an error in one cleanup step does not prevent the others from running."""
+        with mock.patch('InvenTree.tasks.delete_failed_tasks', autospec=True, side_effect=ValueError('abc')), \
+                mock.patch('InvenTree.tasks.delete_old_notifications', autospec=True) as notifications:
+
+            with self.assertRaisesMessage(RuntimeError, 'delete_failed_tasks'):
+                InvenTree.tasks.daily_cleanup()
+
+            notifications.assert_called_once()
+
     def test_task_check_for_updates(self):
         """Test the task check_for_updates."""
         # Check that setting should be empty
@@ -122,6 +274,54 @@ class InvenTreeTaskTests(TestCase):
         self.assertNotEqual(response, '')
         self.assertTrue(bool(response))
 
+    @mock.patch('InvenTree.tasks.check_daily_holdoff', return_value=True)
+    def test_task_run_backup(self, holdoff):
+        """Test that run_backup runs both the database and media backups."""
+        InvenTreeSetting.set_setting('INVENTREE_BACKUP_ENABLE', True, None)
+
+        with mock.patch('InvenTree.tasks.call_command') as command, mock.patch('InvenTree.tasks.record_task_success') as success:
+            InvenTree.tasks.run_backup()
+
+            self.assertEqual(sorted(call.args[0] for call in command.call_args_list), ['dbbackup', 'mediabackup'])
+            success.assert_called_once_with('run_backup')
+
+        # An error in either backup is raised, and the task is not marked as successful
+        for failing in ['dbbackup', 'mediabackup']:
+
+            def run_command(name, *args, failing=failing, **kwargs):
+                if name == failing:
+                    raise ValueError(f'{name} failed')
+
+            with mock.patch('InvenTree.tasks.call_command', side_effect=run_command) as command, mock.patch('InvenTree.tasks.record_task_success') as success:
+                with self.assertRaisesMessage(ValueError, f'{failing} failed'):
+                    InvenTree.tasks.run_backup()
+
+                self.assertEqual(command.call_count, 2)
+                success.assert_not_called()
+
+    @mock.patch('InvenTree.tasks.check_daily_holdoff', return_value=True)
+    def test_task_check_for_updates_etag(self, holdoff):
+        """Test that check_for_updates makes a conditional request once the version is known."""
+        release = mock.Mock(status_code=200, headers={'ETag': '"abc123"'}, text='{"tag_name": "0.99.0"}')
+        not_modified = mock.Mock(status_code=304, headers={}, text='')
+
+        with mock.patch.object(InvenTree.tasks.github_session, 'get', side_effect=[release, not_modified]) as get:
+            # First request is not conditional, and stores the ETag
+            InvenTree.tasks.check_for_updates()
+
+            self.assertNotIn('If-None-Match', get.call_args.kwargs['headers'])
+            self.assertEqual(InvenTreeSetting.get_setting('_INVENTREE_LATEST_VERSION'), '0.99.0')
+            self.assertEqual(InvenTreeSetting.get_setting('_INVENTREE_GITHUB_ETAG'), '"abc123"')
+
+            # Second request sends the stored ETag, and a 304 response leaves the version untouched
+            InvenTreeSetting.set_setting('_check_for_updates_SUCCESS', '', None)
+            InvenTree.tasks.check_for_updates()
+
+            self.assertEqual(get.call_count, 2)
+            self.assertEqual(get.call_args.kwargs['headers']['If-None-Match'], '"abc123"')
+            self.assertEqual(InvenTreeSetting.get_setting('_INVENTREE_LATEST_VERSION'), '0.99.0')
+            self.assertNotEqual(InvenTreeSetting.get_setting('_check_for_updates_SUCCESS'), '')
+
     def test_task_check_for_migrations(self):
         """Test the task check_for_migrations."""
         # Update disabled
@@ -150,3 +350,88 @@ class InvenTreeTaskTests(TestCase):
             migration_path.unlink()
         except IndexError:  # pragma: no cover
             pass
+
+    def test_migration_plan_cache(self):
+        """Test that the migration plan is only rebuilt when the migration state changes."""
+        InvenTree.tasks._migration_state_complete = None
+
+        with mock.patch('InvenTree.tasks.MigrationExecutor', wraps=MigrationExecutor) as executor:
+            self.assertEqual(len(InvenTree.tasks.get_migration_plan()), 0)
+            self.assertEqual(executor.call_count, 1)
+
+            # Nothing has changed - the check is skipped
+            self.assertEqual(len(InvenTree.tasks.get_migration_plan()), 0)
+            self.assertEqual(executor.call_count, 1)
+
+            # The migration files have changed
+            with mock.patch('InvenTree.tasks.get_migration_files_hash', return_value='changed'):
+                self.assertEqual(len(InvenTree.tasks.get_migration_plan()), 0)
+                self.assertEqual(executor.call_count, 2)
+
+            # Files changed back - the state has changed again
+            InvenTree.tasks.get_migration_plan()
+            self.assertEqual(executor.call_count, 3)
+
+            # A migration has been applied
+            MigrationRecorder(connections[DEFAULT_DB_ALIAS]).record_applied('InvenTree', 'fake')
+            self.assertEqual(len(InvenTree.tasks.get_migration_plan()), 0)
+            self.assertEqual(executor.call_count, 4)
+
+            InvenTree.tasks.get_migration_plan()
+            self.assertEqual(executor.call_count, 4)
+
+
+@skipUnless(
+    settings.DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' and InvenTree.tasks.fcntl is not None,
+    'File based database lock is only used for SQLite'
+)
+class DatabaseLockTests(TestCase):
+    """Unit tests for the database_lock helper."""
+
+    def test_sqlite_lock(self):
+        """Test that the lock can only be acquired once."""
+        fcntl = InvenTree.tasks.fcntl
+        connection = connections[DEFAULT_DB_ALIAS]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_name = os.path.join(tmp, 'db.sqlite3')
+
+            with mock.patch.object(connection, 'is_in_memory_db', return_value=False), mock.patch.dict(connection.settings_dict, {'NAME': db_name}):
+
+                with InvenTree.tasks.database_lock('test_lock') as acquired:
+                    self.assertTrue(acquired)
+
+                    # The lock is already held
+                    with InvenTree.tasks.database_lock('test_lock') as acquired_again:
+                        self.assertFalse(acquired_again)
+
+                    # Other locks are not affected
+                    with InvenTree.tasks.database_lock('other_lock') as acquired_other:
+                        self.assertTrue(acquired_other)
+
+                # The lock has been released
+                with InvenTree.tasks.database_lock('test_lock') as acquired:
+                    self.assertTrue(acquired)
+
+                # Hold the migration lock (as if another process were running migrations)
+                with open(f'{db_name}.inventree_migration_lock.lock', 'w') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+                    with mock.patch.dict(os.environ, {'INVENTREE_AUTO_UPDATE': 'True'}), mock.patch.object(InvenTree.tasks, 'get_migration_plan') as plan:
+                        with self.assertLogs(logger='inventree', level='INFO') as cm:
+                            InvenTree.tasks.check_for_migrations()
+
+                        plan.assert_not_called()
+                        self.assertIn('already running in another process', str(cm.output))
+
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+            # The lock file cannot be created (e.g. read-only directory)
+            db_name = os.path.join(tmp, 'missing', 'db.sqlite3')
+
+            with mock.patch.object(connection, 'is_in_memory_db', return_value=False), mock.patch.dict(connection.settings_dict, {'NAME': db_name}):
+                with self.assertLogs(logger='inventree', level='WARNING') as cm:
+                    with InvenTree.tasks.database_lock('test_lock') as acquired:
+                        self.assertTrue(acquired)
+
+                self.assertIn('continuing without lock', str(cm.output))
@@ -3,7 +3,7 @@
 import json
 import os
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
 from unittest import mock
 
@@ -947,8 +947,7 @@ class TestOffloadTask(InvenTreeTestCase):
             self.assertIn("Last attempt for 'dummy_task' was too recent", str(cm.output))
 
         # Mark last attempt a few days ago - should now return True
-        t_old = datetime.now() - timedelta(days=3)
-        t_old = t_old.isoformat()
+        t_old = str(int(time.time()) - 3 * 86400)
         InvenTreeSetting.set_setting('_dummy_task_ATTEMPT', t_old, None)
 
         result = InvenTree.tasks.check_daily_holdoff('dummy_task', 5)
@@ -975,6 +974,28 @@ class TestOffloadTask(InvenTreeTestCase):
             result = InvenTree.tasks.check_daily_holdoff('dummy_task', 2)
             self.assertTrue(result)
 
+        # An attempt recorded by another worker is not hidden by a stale cached value
+        InvenTreeSetting.set_setting('_dummy_task_ATTEMPT', t_old, None)
+        InvenTreeSetting.objects.filter(key='_dummy_task_ATTEMPT').update(value=str(int(time.time())))
+
+        with self.assertLogs(logger='inventree', level='INFO') as cm:
+            result = InvenTree.tasks.check_daily_holdoff('dummy_task', 2)
+            self.assertFalse(result)
+            self.assertIn("Last attempt for 'dummy_task' was too recent", str(cm.output))
+
+    def test_task_timestamp(self):
+        """Tests for parsing stored task timestamps"""
+
+        import InvenTree.tasks
+
+        self.assertEqual(InvenTree.tasks.parse_task_timestamp('1234567'), 1234567)
+        self.assertIsNone(InvenTree.tasks.parse_task_timestamp(''))
+        self.assertIsNone(InvenTree.tasks.parse_task_timestamp('not-a-time'))
+
+        # Values stored in ISO format are also supported
+        t = datetime(2023, 1, 1, 12, 0, 0)
+        self.assertEqual(InvenTree.tasks.parse_task_timestamp(t.isoformat()), int(t.timestamp()))
+
 
 class BarcodeMixinTest(InvenTreeTestCase):
     """Tests for the InvenTreeBarcodeMixin mixin class"""
@@ -348,20 +348,12 @@ class BaseInvenTreeSetting(models.Model):
         return choices
 
     @classmethod
-    def get_setting_object(cls, key, **kwargs):
-        """Return an InvenTreeSetting object matching the given key.
-
-        - Key is case-insensitive
-        - Returns None if no match is made
+    def get_filters(cls, kwargs):
+        """Construct the database filters (other than the key) for a settings lookup.
 
-        First checks the cache to see if this object has recently been accessed,
-        and returns the cached version if so.
+        Note: A plugin instance in kwargs is replaced by its PluginConfig object
         """
-        key = str(key).strip().upper()
-
-        filters = {
-            'key__iexact': key,
-        }
+        filters = {}
 
         # Filter by user
         user = kwargs.get('user', None)
@@ -387,6 +379,25 @@ class BaseInvenTreeSetting(models.Model):
         if method is not None:
             filters['method'] = method
 
+        return filters
+
+    @classmethod
+    def get_setting_object(cls, key, **kwargs):
+        """Return an InvenTreeSetting object matching the given key.
+
+        - Key is case-insensitive
+        - Returns None if no match is made
+
+        First checks the cache to see if this object has recently been accessed,
+        and returns the cached version if so.
+        """
+        key = str(key).strip().upper()
+
+        filters = {
+            'key__iexact': key,
+            **cls.get_filters(kwargs),
+        }
+
         # Perform cache lookup by default
         do_cache = kwargs.pop('cache', True)
 
@@ -460,24 +471,90 @@ class BaseInvenTreeSetting(models.Model):
         setting = cls.get_setting_object(key, **kwargs)
 
         if setting:
-            value = setting.value
-
-            # Cast to boolean if necessary
-            if setting.is_bool():
-                value = InvenTree.helpers.str2bool(value)
-
-            # Cast to integer if necessary
-            if setting.is_int():
-                try:
-                    value = int(value)
-                except (ValueError, TypeError):
-                    value = backup_value
-
+            value = setting.typed_value(backup_value)
         else:
             value = backup_value
 
         return value
 
+    @classmethod
+    def get_many(cls, keys, defaults=None, **kwargs):
+        """Get the values of multiple settings at once.
+
+        - Keys are case-insensitive
+        - Settings are read from the cache where available
+        - Any settings not found in the cache are fetched with a single database query
+        - Missing settings are not created
+
+        Arguments:
+            keys: Iterable of settings keys
+            defaults: Optional dict of backup values (the setting default is used for any key not provided)
+
+        Returns:
+            dict: The value of each requested setting, keyed by the provided key
+        """
+        keys = list(keys)
+        defaults = defaults or {}
+
+        filters = cls.get_filters(kwargs)
+
+        # Perform cache lookup by default
+        do_cache = kwargs.pop('cache', True)
+
+        cache_keys = {}
+
+        for key in keys:
+            key = str(key).strip().upper()
+            cache_keys[key] = cls.create_cache_key(key, **kwargs)
+
+        settings = {}
+
+        if do_cache:
+            try:
+                cached_settings = cache.get_many(cache_keys.values())
+            except AppRegistryNotReady:
+                # Cache is not ready yet
+                cached_settings = {}
+                do_cache = False
+
+            for key, ckey in cache_keys.items():
+                if cached_settings.get(ckey, None) is not None:
+                    settings[key] = cached_settings[ckey]
+
+        missing = [key for key in cache_keys if key not in settings]
+
+        if missing:
+            query = models.Q()
+
+            for key in missing:
+                query |= models.Q(key__iexact=key)
+
+            try:
+                for setting in cls.objects.filter(query, **filters):
+                    settings[setting.key.upper()] = setting
+
+                    if do_cache:
+                        setting.save_to_cache()
+            except (ValueError, IntegrityError, OperationalError):
+                pass
+
+        values = {}
+
+        for key in keys:
+            backup_value = defaults.get(key, None)
+
+            if backup_value is None:
+                backup_value = cls.get_setting_default(key, **kwargs)
+
+            setting = settings.get(str(key).strip().upper(), None)
+
+            if setting:
+                values[key] = setting.typed_value(backup_value)
+            else:
+                values[key] = backup_value
+
+        return values
+
     @classmethod
     def set_setting(cls, key, value, change_user, create=True, **kwargs):
         """Set the value of a particular setting. If it does not exist, option to create it.
@@ -750,6 +827,26 @@ class BaseInvenTreeSetting(models.Model):
 
         return None
 
+    def typed_value(self, backup_value=None):
+        """Return the value of this setting, cast to boolean or integer if required.
+
+        If the value cannot be cast to an integer, the backup value is returned instead.
+        """
+        value = self.value
+
+        # Cast to boolean if necessary
+        if self.is_bool():
+            value = InvenTree.helpers.str2bool(value)
+
+        # Cast to integer if necessary
+        if self.is_int():
+            try:
+                value = int(value)
+            except (ValueError, TypeError):
+                value = backup_value
+
+        return value
+
     def is_bool(self):
         """Check if this setting is required to be a boolean value."""
         validator = self.__class__.get_setting_validator(self.key, **self.get_kwargs())
@@ -199,6 +199,35 @@ class SettingsTest(InvenTreeTestCase):
                 if setting.default_value not in [True, False]:
                     raise ValueError(f'Non-boolean default value specified for {key}')  # pragma: no cover
 
+    def test_get_many(self):
+        """Test that multiple settings can be retrieved at once."""
+        # Values cached by other tests must not be used
+        cache.clear()
+
+        InvenTreeSetting.set_setting('STOCK_STALE_DAYS', 12, None)
+        InvenTreeSetting.set_setting('PART_NAME_FORMAT', 'abc', None)
+
+        values = InvenTreeSetting.get_many(
+            ['stock_stale_days', 'PART_NAME_FORMAT', 'INVENTREE_INSTANCE', '_NOT_A_SETTING'],
+            defaults={'_NOT_A_SETTING': 'xyz'}
+        )
+
+        self.assertEqual(values['stock_stale_days'], 12)
+        self.assertEqual(values['PART_NAME_FORMAT'], 'abc')
+        self.assertEqual(values['INVENTREE_INSTANCE'], 'My very first InvenTree Instance')
+        self.assertEqual(values['_NOT_A_SETTING'], 'xyz')
+
+        # Settings are now read from the cache
+        cache.clear()
+        InvenTreeSetting.get_many(['STOCK_STALE_DAYS', 'PART_NAME_FORMAT'])
+        self.assertIsNotNone(cache.get(InvenTreeSetting.create_cache_key('STOCK_STALE_DAYS')))
+
+        with self.assertNumQueries(0):
+            values = InvenTreeSetting.get_many(['STOCK_STALE_DAYS', 'part_name_format'])
+
+        self.assertEqual(values['STOCK_STALE_DAYS'], 12)
+        self.assertEqual(values['part_name_format'], 'abc')
+
     def test_global_setting_caching(self):
         """Test caching operations for the global settings class"""
 
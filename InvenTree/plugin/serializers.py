@@ -10,7 +10,7 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
 from common.serializers import GenericReferencedSettingSerializer
-from InvenTree.tasks import check_for_migrations, offload_task
+from InvenTree.tasks import QUEUE_SLOW, check_for_migrations, offload_task
 from plugin.models import NotificationUserSetting, PluginConfig, PluginSetting
 
 
@@ -164,7 +164,7 @@ class PluginConfigInstallSerializer(serializers.Serializer):
                 plugin_file.write(f'{" ".join(install_name)}  # Installed {timezone.now()} by {str(self.context["request"].user)}\n')
 
         # Check for migrations
-        offload_task(check_for_migrations, worker=True)
+        offload_task(check_for_migrations, worker=True, queue=QUEUE_SLOW)
 
         return ret
 